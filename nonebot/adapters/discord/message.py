@@ -1,6 +1,7 @@
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable
 from dataclasses import dataclass
 import datetime
+from functools import lru_cache
 import re
 from typing import (
     TYPE_CHECKING,
@@ -8,6 +9,7 @@ from typing import (
     Literal,
     Optional,
     TypedDict,
+    TypeVar,
     Union,
     overload,
 )
@@ -17,11 +19,14 @@ from nonebot.adapters import (
     Message as BaseMessage,
     MessageSegment as BaseMessageSegment,
 )
-from nonebot.compat import type_validate_python
+from nonebot.compat import TypeAdapter
+
+from pydantic import BaseModel
 
 from .api import (
     UNSET,
     ActionRow,
+    Attachment,
     AttachmentSend,
     Button,
     Component,
@@ -39,6 +44,90 @@ from .api import (
 )
 from .utils import unescape
 
+M = TypeVar("M", bound=BaseModel)
+
+_SEGMENT_RE = re.compile(r"<(?P<type>(@!|@&|@|#|/|:|a:|t:))(?P<param>[^<]+?)>")
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=4096)
+def _snowflake(value: Union[SnowflakeType, str]) -> Snowflake:
+    return Snowflake(value)
+
+
+_NESTED_MODELS = (Embed, AttachmentSend, File, MessageReference, ActionRow, TextInput)
+_MODEL_ADAPTERS: dict[type[BaseModel], TypeAdapter[Any]] = {
+    model: TypeAdapter(model) for model in _NESTED_MODELS
+}
+
+
+def _validate_model(model: type[M], value: Any) -> M:
+    """Validate nested segment data with the cached adapter of the model."""
+    return _MODEL_ADAPTERS[model].validate_python(value)
+
+
+_ATTACHMENT_EXTRACTORS: dict[
+    type,
+    Callable[
+        [Any, Optional[str], Optional[bytes]],
+        tuple[str, Optional[str], Optional[bytes]],
+    ],
+] = {
+    str: lambda file, description, content: (file, description, content),
+    File: lambda file, description, content: (
+        file.filename,
+        description,
+        file.content,
+    ),
+    AttachmentSend: lambda file, description, content: (
+        file.filename,
+        file.description,
+        content,
+    ),
+}
+"""Extract `(filename, description, content)` from `MessageSegment.attachment` args."""
+
+
+def _format_text(data: "TextData") -> str:
+    return data["text"]
+
+
+def _format_mention_user(data: "MentionUserData") -> str:
+    return f"<@{data['user_id']}>"
+
+
+def _format_mention_role(data: "MentionRoleData") -> str:
+    return f"<@&{data['role_id']}>"
+
+
+def _format_mention_channel(data: "MentionChannelData") -> str:
+    return f"<#{data['channel_id']}>"
+
+
+def _format_mention_everyone(data: dict[str, Any]) -> str:
+    return "@everyone"
+
+
+def _format_custom_emoji(data: "CustomEmojiData") -> str:
+    if data.get("animated"):
+        return f"<a:{data['name']}:{data['id']}>"
+    else:
+        return f"<:{data['name']}:{data['id']}>"
+
+
+def _format_timestamp(data: "TimestampData") -> str:
+    style = data.get("style")
+    return (
+        f"<t:{data['timestamp']}"
+        + (
+            f":{style.value if isinstance(style, TimeStampStyle) else style}"
+            if style
+            else ""
+        )
+        + ">"
+    )
+
 
 class MessageSegment(BaseMessageSegment["Message"]):
     @classmethod
@@ -52,20 +141,15 @@ class MessageSegment(BaseMessageSegment["Message"]):
         description: Optional[str] = None,
         content: Optional[bytes] = None,
     ) -> "AttachmentSegment":
-        if isinstance(file, str):
-            _filename = file
-            _description = description
-            _content = content
-        elif isinstance(file, File):
-            _filename = file.filename
-            _description = description
-            _content = file.content
-        elif isinstance(file, AttachmentSend):
-            _filename = file.filename
-            _description = file.description
-            _content = content
-        else:
-            raise TypeError("file must be str, File or AttachmentSend")
+        if (extractor := _ATTACHMENT_EXTRACTORS.get(type(file))) is None:
+            # fallback for subclasses of the supported types
+            for type_, extractor_ in _ATTACHMENT_EXTRACTORS.items():
+                if isinstance(file, type_):
+                    extractor = extractor_
+                    break
+            else:
+                raise TypeError("file must be str, File or AttachmentSend")
+        _filename, _description, _content = extractor(file, description, content)
         if _content is None:
             return AttachmentSegment(
                 "attachment",
@@ -89,7 +173,7 @@ class MessageSegment(BaseMessageSegment["Message"]):
 
     @staticmethod
     def sticker(sticker_id: SnowflakeType) -> "StickerSegment":
-        return StickerSegment("sticker", {"id": Snowflake(sticker_id)})
+        return StickerSegment("sticker", {"id": _snowflake(sticker_id)})
 
     @staticmethod
     def embed(embed: Embed) -> "EmbedSegment":
@@ -112,17 +196,19 @@ class MessageSegment(BaseMessageSegment["Message"]):
         )
 
     @staticmethod
-    def mention_user(user_id: SnowflakeType) -> "MentionUserSegment":
-        return MentionUserSegment("mention_user", {"user_id": Snowflake(user_id)})
+    def mention_user(user_id: Union[SnowflakeType, str]) -> "MentionUserSegment":
+        return MentionUserSegment("mention_user", {"user_id": _snowflake(user_id)})
 
     @staticmethod
-    def mention_role(role_id: SnowflakeType) -> "MentionRoleSegment":
-        return MentionRoleSegment("mention_role", {"role_id": Snowflake(role_id)})
+    def mention_role(role_id: Union[SnowflakeType, str]) -> "MentionRoleSegment":
+        return MentionRoleSegment("mention_role", {"role_id": _snowflake(role_id)})
 
     @staticmethod
-    def mention_channel(channel_id: SnowflakeType) -> "MentionChannelSegment":
+    def mention_channel(
+        channel_id: Union[SnowflakeType, str],
+    ) -> "MentionChannelSegment":
         return MentionChannelSegment(
-            "mention_channel", {"channel_id": Snowflake(channel_id)}
+            "mention_channel", {"channel_id": _snowflake(channel_id)}
         )
 
     @staticmethod
@@ -165,9 +251,9 @@ class MessageSegment(BaseMessageSegment["Message"]):
             _reference = reference
         else:
             _reference = MessageReference(
-                message_id=Snowflake(reference) if reference else UNSET,
-                channel_id=Snowflake(channel_id) if channel_id else UNSET,
-                guild_id=Snowflake(guild_id) if guild_id else UNSET,
+                message_id=_snowflake(reference) if reference else UNSET,
+                channel_id=_snowflake(channel_id) if channel_id else UNSET,
+                guild_id=_snowflake(guild_id) if guild_id else UNSET,
                 fail_if_not_exists=fail_if_not_exists or UNSET,
             )
 
@@ -180,26 +266,29 @@ class MessageSegment(BaseMessageSegment["Message"]):
     @classmethod
     @override
     def _validate(cls, value) -> Self:
-        if isinstance(value, cls):
+        value_type = type(value)
+        if value_type is cls:
             return value
-        if isinstance(value, MessageSegment):
-            raise ValueError(f"Type {type(value)} can not be converted to {cls}")
-        if not isinstance(value, dict):
-            raise ValueError(f"Expected dict for MessageSegment, got {type(value)}")
-        if "type" not in value:
+        if value_type is not dict:
+            if isinstance(value, cls):
+                return value
+            if isinstance(value, MessageSegment):
+                raise ValueError(f"Type {value_type} can not be converted to {cls}")
+            if not isinstance(value, dict):
+                raise ValueError(f"Expected dict for MessageSegment, got {value_type}")
+        if (_type := value.get("type", _MISSING)) is _MISSING:
             raise ValueError(
                 f"Expected dict with 'type' for MessageSegment, got {value}"
             )
-        _type = value["type"]
-        if _type not in SEGMENT_TYPE_MAP:
+        if (segment_type := SEGMENT_TYPE_MAP.get(_type)) is None:
             raise ValueError(f"Invalid MessageSegment type: {_type}")
-        segment_type = SEGMENT_TYPE_MAP[_type]
 
-        # casting value to subclass of MessageSegment
-        if cls is MessageSegment:
-            return type_validate_python(segment_type, value)
+        # casting value to subclass of MessageSegment,
+        # only segments with nested models need their own validation
+        if cls is MessageSegment and segment_type in _NESTED_SEGMENT_TYPES:
+            return segment_type._validate(value)
         # init segment instance directly if type matched
-        if cls is segment_type:
+        if cls is MessageSegment or cls is segment_type:
             return segment_type(type=_type, data=value.get("data", {}))
         raise ValueError(f"Segment type {_type!r} can not be converted to {cls}")
 
@@ -253,9 +342,9 @@ class ComponentSegment(MessageSegment):
                     f"Expected dict with 'type' for ComponentData, got {component}"
                 )
             if component["type"] == ComponentType.ActionRow:
-                instance.data["component"] = type_validate_python(ActionRow, component)
+                instance.data["component"] = _validate_model(ActionRow, component)
             elif component["type"] == ComponentType.TextInput:
-                instance.data["component"] = type_validate_python(TextInput, component)
+                instance.data["component"] = _validate_model(TextInput, component)
             else:
                 raise ValueError(f"Invalid ComponentType: {component['type']}")
         return instance
@@ -275,10 +364,7 @@ class CustomEmojiSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        if self.data.get("animated"):
-            return f"<a:{self.data['name']}:{self.data['id']}>"
-        else:
-            return f"<:{self.data['name']}:{self.data['id']}>"
+        return _format_custom_emoji(self.data)
 
 
 class MentionUserData(TypedDict):
@@ -293,7 +379,7 @@ class MentionUserSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return f"<@{self.data['user_id']}>"
+        return _format_mention_user(self.data)
 
 
 class MentionChannelData(TypedDict):
@@ -308,7 +394,7 @@ class MentionChannelSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return f"<#{self.data['channel_id']}>"
+        return _format_mention_channel(self.data)
 
 
 class MentionRoleData(TypedDict):
@@ -323,7 +409,7 @@ class MentionRoleSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return f"<@&{self.data['role_id']}>"
+        return _format_mention_role(self.data)
 
 
 @dataclass
@@ -333,7 +419,7 @@ class MentionEveryoneSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return "@everyone"
+        return _format_mention_everyone(self.data)
 
 
 class TimestampData(TypedDict):
@@ -349,16 +435,7 @@ class TimestampSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        style = self.data.get("style")
-        return (
-            f"<t:{self.data['timestamp']}"
-            + (
-                f":{style.value if isinstance(style, TimeStampStyle) else style}"
-                if style
-                else ""
-            )
-            + ">"
-        )
+        return _format_timestamp(self.data)
 
 
 class TextData(TypedDict):
@@ -373,7 +450,7 @@ class TextSegment(MessageSegment):
 
     @override
     def __str__(self) -> str:
-        return self.data["text"]
+        return _format_text(self.data)
 
 
 class EmbedData(TypedDict):
@@ -399,7 +476,7 @@ class EmbedSegment(MessageSegment):
                 f"Expected dict with 'embed' in 'data' for EmbedSegment, got {value}"
             )
         if not isinstance(embed := instance.data["embed"], Embed):
-            instance.data["embed"] = type_validate_python(Embed, embed)
+            instance.data["embed"] = _validate_model(Embed, embed)
         return instance
 
 
@@ -427,13 +504,11 @@ class AttachmentSegment(MessageSegment):
                 f"Expected dict with 'attachment' in 'data' for AttachmentSegment, got {value}"
             )
         if not isinstance(attachment := instance.data["attachment"], AttachmentSend):
-            instance.data["attachment"] = type_validate_python(
-                AttachmentSend, attachment
-            )
+            instance.data["attachment"] = _validate_model(AttachmentSend, attachment)
         if (file := instance.data.get("file")) is not None and not isinstance(
             file, File
         ):
-            instance.data["file"] = type_validate_python(File, file)
+            instance.data["file"] = _validate_model(File, file)
         return instance
 
 
@@ -460,9 +535,7 @@ class ReferenceSegment(MessageSegment):
                 f"Expected dict with 'reference' in 'data' for ReferenceSegment, got {value}"
             )
         if not isinstance(reference := instance.data["reference"], MessageReference):
-            instance.data["reference"] = type_validate_python(
-                MessageReference, reference
-            )
+            instance.data["reference"] = _validate_model(MessageReference, reference)
         return instance
 
 
@@ -481,6 +554,99 @@ SEGMENT_TYPE_MAP = {
     "reference": ReferenceSegment,
 }
 
+_NESTED_SEGMENT_TYPES: frozenset[type[MessageSegment]] = frozenset(
+    {AttachmentSegment, EmbedSegment, ComponentSegment, ReferenceSegment}
+)
+"""Segment types whose data holds models that need validation."""
+
+
+_TS_STYLES = {style.value: style for style in TimeStampStyle}
+
+
+def _emit_user(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    return MessageSegment.mention_user(param)
+
+
+def _emit_role(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    return MessageSegment.mention_role(param)
+
+
+def _emit_channel(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    return MessageSegment.mention_channel(param)
+
+
+def _emit_nop(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    # TODO: slash command
+    return None
+
+
+def _emit_emoji(param: str, embed: re.Match[str], animated: bool) -> MessageSegment:
+    if len(cut := param.split(":")) == 2:
+        return MessageSegment.custom_emoji(cut[0], cut[1], animated)
+    return MessageSegment.text(unescape(embed.group()))
+
+
+def _emit_emoji_static(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    return _emit_emoji(param, embed, False)
+
+
+def _emit_emoji_animated(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    return _emit_emoji(param, embed, True)
+
+
+def _emit_timestamp(param: str, embed: re.Match[str]) -> Optional[MessageSegment]:
+    if (
+        len(cut := param.split(":")) == 2
+        and cut[0].isdigit()
+        and (style := _TS_STYLES.get(cut[1])) is not None
+    ):
+        return MessageSegment.timestamp(int(cut[0]), style)
+    elif param.isdigit():
+        return MessageSegment.timestamp(int(param))
+    return MessageSegment.text(unescape(embed.group()))
+
+
+_EMIT: dict[str, Callable[[str, re.Match[str]], Optional[MessageSegment]]] = {
+    "@!": _emit_user,
+    "@": _emit_user,
+    "@&": _emit_role,
+    "#": _emit_channel,
+    "/": _emit_nop,
+    ":": _emit_emoji_static,
+    "a:": _emit_emoji_animated,
+    "t:": _emit_timestamp,
+}
+"""Segment builders keyed by the markup prefix matched in `_SEGMENT_RE`."""
+
+_CONTENT_TYPES = frozenset(
+    {
+        "text",
+        "custom_emoji",
+        "mention_user",
+        "mention_role",
+        "mention_everyone",
+        "mention_channel",
+        "timestamp",
+    }
+)
+"""Segment types rendered into the message content."""
+
+_FORMATTERS: dict[type[MessageSegment], Callable[[Any], str]] = {
+    CustomEmojiSegment: _format_custom_emoji,
+    MentionUserSegment: _format_mention_user,
+    MentionRoleSegment: _format_mention_role,
+    MentionEveryoneSegment: _format_mention_everyone,
+    MentionChannelSegment: _format_mention_channel,
+    TimestampSegment: _format_timestamp,
+}
+"""Content formatters shared with `__str__` of the builtin segment classes,
+text segments are handled inline by `Message.extract_content`."""
+
+
+def _attachment_description(attachment: Attachment) -> Optional[str]:
+    description = attachment.description
+    return description if type(description) is str else None
+
 
 class Message(BaseMessage[MessageSegment]):
     @classmethod
@@ -507,42 +673,25 @@ class Message(BaseMessage[MessageSegment]):
     @staticmethod
     @override
     def _construct(msg: str) -> Iterable[MessageSegment]:
+        text = MessageSegment.text
+        unescape_ = unescape
+        # no markup at all, skip the regex scan
+        if "<" not in msg:
+            if msg:
+                yield text(unescape_(msg))
+            return
+        emit = _EMIT
         text_begin = 0
-        for embed in re.finditer(
-            r"<(?P<type>(@!|@&|@|#|/|:|a:|t:))(?P<param>[^<]+?)>",
-            msg,
-        ):
-            if content := msg[text_begin : embed.pos + embed.start()]:
-                yield MessageSegment.text(unescape(content))
-            text_begin = embed.pos + embed.end()
-            if embed.group("type") in ("@!", "@"):
-                yield MessageSegment.mention_user(Snowflake(embed.group("param")))
-            elif embed.group("type") == "@&":
-                yield MessageSegment.mention_role(Snowflake(embed.group("param")))
-            elif embed.group("type") == "#":
-                yield MessageSegment.mention_channel(Snowflake(embed.group("param")))
-            elif embed.group("type") == "/":
-                # TODO: slash command
-                pass
-            elif embed.group("type") in (":", "a:"):
-                if len(cut := embed.group("param").split(":")) == 2:
-                    yield MessageSegment.custom_emoji(
-                        cut[0], cut[1], embed.group("type") == "a:"
-                    )
-                else:
-                    yield MessageSegment.text(unescape(embed.group()))
-            else:
-                if (
-                    len(cut := embed.group("param").split(":")) == 2
-                    and cut[0].isdigit()
-                ):
-                    yield MessageSegment.timestamp(int(cut[0]), TimeStampStyle(cut[1]))
-                elif embed.group().isdigit():
-                    yield MessageSegment.timestamp(int(embed.group()))
-                else:
-                    yield MessageSegment.text(unescape(embed.group()))
+        for embed in _SEGMENT_RE.finditer(msg):
+            start, end = embed.span()
+            if content := msg[text_begin:start]:
+                yield text(unescape_(content))
+            text_begin = end
+            type_, param = embed.group("type", "param")
+            if (segment := emit[type_](param, embed)) is not None:
+                yield segment
         if content := msg[text_begin:]:
-            yield MessageSegment.text(unescape(content))
+            yield text(unescape_(content))
 
     @classmethod
     def from_guild_message(cls, message: MessageGet) -> "Message":
@@ -556,11 +705,7 @@ class Message(BaseMessage[MessageSegment]):
                 MessageSegment.attachment(
                     AttachmentSend(
                         filename=attachment.filename,
-                        description=(
-                            attachment.description
-                            if isinstance(attachment.description, str)
-                            else None
-                        ),
+                        description=_attachment_description(attachment),
                     )
                 )
                 for attachment in message.attachments
@@ -574,57 +719,59 @@ class Message(BaseMessage[MessageSegment]):
         return msg
 
     def extract_content(self) -> str:
-        return "".join(
-            str(seg)
-            for seg in self
-            if seg.type
-            in (
-                "text",
-                "custom_emoji",
-                "mention_user",
-                "mention_role",
-                "mention_everyone",
-                "mention_channel",
-                "timestamp",
-            )
-        )
+        formatters = _FORMATTERS
+        parts: list[str] = []
+        for seg in self:
+            seg_class = type(seg)
+            if seg_class is TextSegment:
+                parts.append(seg.data["text"])
+            elif (format_ := formatters.get(seg_class)) is not None:
+                parts.append(format_(seg.data))
+            # fallback to str() for subclasses which may override __str__
+            elif seg.type in _CONTENT_TYPES:
+                parts.append(str(seg))
+        return "".join(parts)
 
 
 def parse_message(message: Union[Message, MessageSegment, str]) -> dict[str, Any]:
-    message = MessageSegment.text(message) if isinstance(message, str) else message
-    message = message if isinstance(message, Message) else Message(message)
+    if type(message) is not Message:
+        if isinstance(message, str):
+            message = Message(MessageSegment.text(message))
+        elif not isinstance(message, Message):
+            message = Message(message)
 
     content = message.extract_content() or None
-    if embeds := (message["embed"] or None):
-        embeds = [embed.data["embed"] for embed in embeds]
-    if reference := (message["reference"] or None):
-        reference = reference[-1].data["reference"]
-    if components := (message["component"] or None):
-        components = [component.data["component"] for component in components]
-    if sticker_ids := (message["sticker"] or None):
-        sticker_ids = [sticker.data["id"] for sticker in sticker_ids]
-
-    attachments = None
-    files = None
-    if attachments_segment := (message["attachment"] or None):
-        attachments = [
-            attachment.data["attachment"] for attachment in attachments_segment
-        ]
-        files = [
-            attachment.data["file"]
-            for attachment in attachments_segment
-            if attachment.data["file"] is not None
-        ]
+    embeds: list[Embed] = []
+    reference: Optional[MessageReference] = None
+    components: list[DirectComponent] = []
+    sticker_ids: list[Snowflake] = []
+    attachments: list[AttachmentSend] = []
+    files: list[File] = []
+    for seg in message:
+        type_ = seg.type
+        if type_ == "embed":
+            embeds.append(seg.data["embed"])
+        elif type_ == "reference":
+            reference = seg.data["reference"]
+        elif type_ == "component":
+            components.append(seg.data["component"])
+        elif type_ == "sticker":
+            sticker_ids.append(seg.data["id"])
+        elif type_ == "attachment":
+            attachments.append(seg.data["attachment"])
+            if (file := seg.data["file"]) is not None:
+                files.append(file)
+
     return {
         k: v
         for k, v in {
             "content": content,
-            "embeds": embeds,
+            "embeds": embeds or None,
             "message_reference": reference,
-            "components": components,
-            "sticker_ids": sticker_ids,
-            "files": files,
-            "attachments": attachments,
+            "components": components or None,
+            "sticker_ids": sticker_ids or None,
+            "files": files if attachments else None,
+            "attachments": attachments or None,
         }.items()
         if v is not None
     }
@@ -52,6 +52,8 @@ def escape(s: str) -> str:
 
 
 def unescape(s: str) -> str:
+    if "&" not in s:
+        return s
     return s.replace("&lt;", "<").replace("&gt;", ">").replace("&amp;", "&")
 
 